@@ -4,7 +4,7 @@ import asyncio
 import logging
 import os
 
-from eoapi.raster.app import app
+from eoapi.raster.app import app, db_pool_kwargs
 from mangum import Mangum
 from titiler.pgstac.db import connect_to_db
 
@@ -15,7 +15,7 @@ logging.getLogger("mangum.http").setLevel(logging.ERROR)
 @app.on_event("startup")
 async def startup_event() -> None:
     """Connect to database on startup."""
-    await connect_to_db(app)
+    await connect_to_db(app, pool_kwargs=db_pool_kwargs)
 
 
 handler = Mangum(app, lifespan="off")
@@ -1,18 +1,23 @@
 """eoAPI Raster application."""
 
 import logging
-import re
-import urllib.parse
+import threading
+import time
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Type
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Type
+from urllib.parse import quote_plus
 
 import attr
 import jinja2
 import pystac
 from eoapi.raster import __version__ as eoapi_raster_version
 from eoapi.raster.config import ApiSettings
+from eoapi.raster.middleware import CacheControlMiddleware
 from fastapi import Depends, FastAPI, Path, Query
+from fastapi.responses import ORJSONResponse
 from psycopg import OperationalError
 from psycopg.rows import dict_row
 from psycopg_pool import PoolTimeout
@@ -21,6 +26,7 @@ from starlette.middleware.cors import CORSMiddleware
 from starlette.requests import Request
 from starlette.responses import HTMLResponse
 from starlette.templating import Jinja2Templates
+from starlette_cramjam.compression import Compression
 from starlette_cramjam.middleware import CompressionMiddleware
 from titiler.core.dependencies import DefaultDependency
 from titiler.core.errors import DEFAULT_STATUS_CODES, add_exception_handlers
@@ -31,7 +37,6 @@ from titiler.core.factory import (
     TilerFactory,
     TMSFactory,
 )
-from titiler.core.middleware import CacheControlMiddleware
 from titiler.extensions.viewer import cogViewerExtension
 from titiler.mosaic.errors import MOSAIC_STATUS_CODES
 from titiler.pgstac import mosaic, reader
@@ -61,16 +66,50 @@ jinja2_env = jinja2.Environment(
         [
             jinja2.PackageLoader(__package__, "templates"),
         ]
-    )
+    ),
+    # Templates are static in production, no need to check for changes on each render
+    auto_reload=settings.debug,
+    bytecode_cache=jinja2.FileSystemBytecodeCache(),
 )
 templates = Jinja2Templates(env=jinja2_env)
 
 
+@lru_cache(maxsize=2048)
+def _vrt_url(url: str, sd_name: Optional[str], bands: Optional[Tuple[int, ...]]) -> str:
+    """Create GDAL VRT connection string (cached as urls repeat across tiles)."""
+    # Same encoding as `urlencode(..., safe=",")`, without its generic dict/quoting
+    # machinery. Bands are only digits so they don't need to be quoted.
+    params = []
+    if sd_name:
+        params.append("sd_name=" + quote_plus(sd_name, safe=","))
+
+    if bands:
+        params.append("bands=" + ",".join(map(str, bands)))
+
+    return f"vrt:///vsicurl/{url}?{'&'.join(params)}"
+
+
+def _build_vrt_url(
+    url: str,
+    sd_name: Optional[str] = None,
+    bands: Optional[Sequence[int]] = None,
+) -> str:
+    """Return a VRT url selecting the subdataset and/or bands, or the url unchanged."""
+    if not sd_name and not bands:
+        return url
+
+    return _vrt_url(url, sd_name or None, tuple(bands) if bands else None)
+
+
+# Shared (read-only) reader options for requests without subdataset parameters
+_EMPTY_READER_OPTIONS: Mapping = MappingProxyType({})
+
+
 @dataclass(init=False)
 class ReaderParams(DefaultDependency):
     """reader parameters."""
 
-    reader_options: Dict = field(init=False)
+    reader_options: Mapping = field(init=False)
 
     def __init__(
         self,
@@ -90,6 +129,10 @@ class ReaderParams(DefaultDependency):
         ] = None,
     ):
         """Initialize ReaderParams"""
+        if not subdataset_name and not subdataset_bands:
+            self.reader_options = _EMPTY_READER_OPTIONS
+            return
+
         params = {}
         if subdataset_name:
             params["subdataset_name"] = subdataset_name
@@ -106,18 +149,9 @@ class CustomReader(Reader):
     subdataset_bands: Optional[List[int]] = attr.ib(default=None)
 
     def __attrs_post_init__(self):
-        vrt_params = {}
-        if self.subdataset_name:
-            vrt_params["sd_name"] = self.subdataset_name
-
-        if self.subdataset_bands:
-            vrt_params["bands"] = ",".join(
-                [str(band) for band in self.subdataset_bands]
-            )
-
-        if vrt_params:
-            params = urllib.parse.urlencode(vrt_params, safe=",")
-            self.input = f"vrt:///vsicurl/{self.input}?{params}"
+        self.input = _build_vrt_url(
+            self.input, self.subdataset_name, self.subdataset_bands
+        )
         super().__attrs_post_init__()
 
 
@@ -136,11 +170,19 @@ class PGSTACBackend(mosaic.PGSTACBackend):
     reader: Type[BaseReader] = attr.ib(init=False, default=CustomSTACReader)
 
 
+# Connection options for the pgstac pool (pool sizing is set by titiler-pgstac's
+# `PostgresSettings`, e.g `DB_MIN_CONN_SIZE`/`DB_MAX_CONN_SIZE`/`DB_MAX_IDLE`)
+db_pool_kwargs = {
+    "options": "-c search_path=pgstac,public -c application_name=pgstac",
+    "prepare_threshold": settings.db_prepare_threshold,
+}
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI Lifespan."""
     # Create Connection Pool
-    await connect_to_db(app)
+    await connect_to_db(app, pool_kwargs=db_pool_kwargs)
     yield
     # Close the Connection Pool
     await close_db_connection(app)
@@ -153,6 +195,7 @@ app = FastAPI(
     docs_url="/api.html",
     root_path=settings.root_path,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 add_exception_handlers(app, DEFAULT_STATUS_CODES)
 add_exception_handlers(app, MOSAIC_STATUS_CODES)
@@ -169,10 +212,19 @@ if settings.cors_origins:
 app.add_middleware(
     CacheControlMiddleware,
     cachecontrol=settings.cachecontrol,
-    exclude_path={r"/healthz", r"/collections"},
+    exclude_prefix=("/healthz", "/collections"),
 )
 app.add_middleware(
     CompressionMiddleware,
+    # Prefer zstd/brotli (better ratio for JSON/HTML) when the client accepts them
+    compression=[
+        Compression.zstd,
+        Compression.br,
+        Compression.gzip,
+        Compression.deflate,
+    ],
+    # Default brotli level (11) is too slow for dynamic responses
+    compression_level=4,
     exclude_mediatype={
         "image/jpeg",
         "image/jpg",
@@ -185,14 +237,36 @@ app.add_middleware(
 
 ###############################################################################
 # `Secret` endpoint for mosaic builder. Do not need to be public (in the OpenAPI docs)
+_COLLECTIONS_CACHE: Dict = {"data": None, "expires": 0.0}
+_COLLECTIONS_LOCK = threading.Lock()
+
+
 @app.get("/collections", include_in_schema=False)
-async def list_collection(request: Request):
+def list_collection(request: Request):
     """list collections."""
-    with request.app.state.dbpool.connection() as conn:
-        with conn.cursor(row_factory=dict_row) as cursor:
-            cursor.execute("SELECT * FROM pgstac.all_collections();")
-            r = cursor.fetchone()
-            return r.get("all_collections", [])
+    # NOTE: titiler-pgstac uses a synchronous psycopg pool so we use a sync endpoint
+    # (run in FastAPI's threadpool) to avoid blocking the event loop.
+    ttl = settings.collections_cache_ttl
+
+    # Collections rarely change, we keep the list for `ttl` seconds. The lock makes
+    # concurrent requests wait for a single database query on cache miss.
+    with _COLLECTIONS_LOCK:
+        now = time.monotonic()
+        if _COLLECTIONS_CACHE["data"] is None or _COLLECTIONS_CACHE["expires"] <= now:
+            with request.app.state.dbpool.connection() as conn:
+                with conn.cursor(row_factory=dict_row) as cursor:
+                    cursor.execute("SELECT * FROM pgstac.all_collections();")
+                    r = cursor.fetchone()
+
+            _COLLECTIONS_CACHE.update(
+                data=r.get("all_collections", []), expires=now + ttl
+            )
+
+        collections = _COLLECTIONS_CACHE["data"]
+
+    return ORJSONResponse(
+        collections, headers={"Cache-Control": f"public, max-age={ttl}"}
+    )
 
 
 ###############################################################################
@@ -234,20 +308,20 @@ add_search_register_route(
 add_search_list_route(app, prefix="/searches", tags=["STAC Search"])
 
 
+_REGISTER_PATH = str(app.url_path_for("register_search"))
+_COLLECTIONS_PATH = str(app.url_path_for("list_collection"))
+
+
 @app.get("/searches/builder", response_class=HTMLResponse, tags=["STAC Search"])
 async def virtual_mosaic_builder(request: Request):
     """Mosaic Builder Viewer."""
-    base_url = str(request.base_url)
+    base_url = str(request.base_url).rstrip("/")
     return templates.TemplateResponse(
         name="mosaic-builder.html",
         context={
             "request": request,
-            "register_endpoint": str(
-                app.url_path_for("register_search").make_absolute_url(base_url=base_url)
-            ),
-            "collections_endpoint": str(
-                app.url_path_for("list_collection").make_absolute_url(base_url=base_url)
-            ),
+            "register_endpoint": base_url + _REGISTER_PATH,
+            "collections_endpoint": base_url + _COLLECTIONS_PATH,
         },
         media_type="text/html",
     )
@@ -281,11 +355,6 @@ stac = MultiBaseTilerFactory(
     router_prefix="/collections/{collection_id}/items/{item_id}",
     add_viewer=True,
 )
-app.include_router(
-    stac.router,
-    tags=["STAC Item"],
-    prefix="/collections/{collection_id}/items/{item_id}",
-)
 
 
 @stac.router.get("/viewer", response_class=HTMLResponse)
@@ -335,22 +404,13 @@ def ItemAssetIdParams(
     ] = None,
 ):
     """STAC Item Asset dependency."""
+    # `get_stac_item` is memoized (TTL cache keyed on collection/item) by titiler-pgstac
+    # so tile bursts over the same item only hit the database once.
     item = get_stac_item(request.app.state.dbpool, collection_id, item_id)
     asset_info = item.assets[asset_id]
     url = asset_info.get_absolute_href() or asset_info.href
 
-    vrt_params = {}
-    if subdataset_name:
-        vrt_params["sd_name"] = subdataset_name
-
-    if subdataset_bands:
-        vrt_params["bands"] = ",".join([str(band) for band in subdataset_bands])
-
-    if vrt_params:
-        params = urllib.parse.urlencode(vrt_params, safe=",")
-        url = f"vrt:///vsicurl/{url}?{params}"
-
-    return url
+    return _build_vrt_url(url, subdataset_name, subdataset_bands)
 
 
 ###############################################################################
@@ -392,18 +452,7 @@ def SdsParams(
         ),
     ] = None,
 ):
-    vrt_params = {}
-    if subdataset_name:
-        vrt_params["sd_name"] = subdataset_name
-
-    if subdataset_bands:
-        vrt_params["bands"] = ",".join([str(band) for band in subdataset_bands])
-
-    if vrt_params:
-        params = urllib.parse.urlencode(vrt_params, safe=",")
-        url = f"vrt:///vsicurl/{url}?{params}"
-
-    return url
+    return _build_vrt_url(url, subdataset_name, subdataset_bands)
 
 
 assets = TilerFactory(
@@ -450,6 +499,12 @@ app.include_router(
 
 ###############################################################################
 # Health Check Endpoint
+
+# PgSTAC version doesn't change while the application is running, once we got it
+# we only check that the database is reachable.
+_PGSTAC_VERSION: Optional[Tuple] = None
+
+
 @app.get("/healthz", description="Health Check", tags=["Health Check"])
 def ping(
     timeout: int = Query(
@@ -457,13 +512,19 @@ def ping(
     ),
 ) -> Dict:
     """Health check."""
+    global _PGSTAC_VERSION
+
     try:
         with app.state.dbpool.connection(timeout) as conn:
             with conn.cursor() as cursor:
-                cursor.execute("SELECT version from pgstac.migrations;")
-                version = cursor.fetchone()
-        return {"database_online": True, "pgstac_version": version}
+                if _PGSTAC_VERSION:
+                    cursor.execute("SELECT 1;")
+                else:
+                    cursor.execute("SELECT version from pgstac.migrations;")
+                    _PGSTAC_VERSION = cursor.fetchone()
+        return {"database_online": True, "pgstac_version": _PGSTAC_VERSION}
     except (OperationalError, PoolTimeout):
+        _PGSTAC_VERSION = None
         return {"database_online": False}
 
 
@@ -476,85 +537,24 @@ def ping(
 )
 def landing(request: Request):
     """Get landing page."""
+    baseurl = str(request.base_url).rstrip("/")
     data = {
         "title": settings.name or "eoAPI-raster",
         "links": [
-            {
-                "title": "Landing page",
-                "href": str(request.url_for("landing")),
-                "type": "text/html",
-                "rel": "self",
-            },
-            {
-                "title": "the API definition (JSON)",
-                "href": str(request.url_for("openapi")),
-                "type": "application/vnd.oai.openapi+json;version=3.0",
-                "rel": "service-desc",
-            },
-            {
-                "title": "the API documentation",
-                "href": str(request.url_for("swagger_ui_html")),
-                "type": "text/html",
-                "rel": "service-doc",
-            },
-            {
-                "title": "eoAPI Virtual Mosaic list (JSON)",
-                "href": str(app.url_path_for("list_searches")),
-                "type": "application/json",
-                "rel": "data",
-            },
-            {
-                "title": "eoAPI Virtual Mosaic builder",
-                "href": str(app.url_path_for("virtual_mosaic_builder")),
-                "type": "text/html",
-                "rel": "data",
-            },
-            {
-                "title": "eoAPI Virtual Mosaic viewer (template URL)",
-                "href": str(app.url_path_for("map_viewer", search_id="{search_id}")),
-                "type": "text/html",
-                "rel": "data",
-                "templated": True,
-            },
-            {
-                "title": "eoAPI Collection viewer (template URL)",
-                "href": str(
-                    app.url_path_for("map_viewer", collection_id="{collection_id}")
-                ),
-                "type": "text/html",
-                "rel": "data",
-                "templated": True,
-            },
-            {
-                "title": "eoAPI Item viewer (template URL)",
-                "href": str(
-                    app.url_path_for(
-                        "map_viewer",
-                        collection_id="{collection_id}",
-                        item_id="{item_id}",
-                    )
-                ),
-                "type": "text/html",
-                "rel": "data",
-                "templated": True,
-            },
+            {**link, "href": baseurl + link["href"]} if absolute else link
+            for absolute, link in _LANDING_LINKS
         ],
     }
 
     urlpath = request.url.path
-    if root_path := request.app.root_path:
-        urlpath = re.sub(r"^" + root_path, "", urlpath)
-    crumbs = []
-    baseurl = str(request.base_url).rstrip("/")
+    if (root_path := request.app.root_path) and urlpath.startswith(root_path):
+        urlpath = urlpath[len(root_path) :]
 
-    crumbpath = str(baseurl)
+    crumbs = []
+    crumbpath = baseurl
     for crumb in urlpath.split("/"):
-        crumbpath = crumbpath.rstrip("/")
-        part = crumb
-        if part is None or part == "":
-            part = "Home"
-        crumbpath += f"/{crumb}"
-        crumbs.append({"url": crumbpath.rstrip("/"), "part": part.capitalize()})
+        crumbpath = f"{crumbpath}/{crumb}".rstrip("/")
+        crumbs.append({"url": crumbpath, "part": (crumb or "Home").capitalize()})
 
     return templates.TemplateResponse(
         request,
@@ -574,3 +574,92 @@ def landing(request: Request):
             "urlparams": str(request.url.query),
         },
     )
+
+
+# Landing page links only depend on the routes, so we resolve them once at startup.
+# Links flagged as `absolute` get prefixed with the request's base url.
+_LANDING_LINKS: Tuple[Tuple[bool, Dict], ...] = (
+    (
+        True,
+        {
+            "title": "Landing page",
+            "href": str(app.url_path_for("landing")),
+            "type": "text/html",
+            "rel": "self",
+        },
+    ),
+    (
+        True,
+        {
+            "title": "the API definition (JSON)",
+            "href": str(app.url_path_for("openapi")),
+            "type": "application/vnd.oai.openapi+json;version=3.0",
+            "rel": "service-desc",
+        },
+    ),
+    (
+        True,
+        {
+            "title": "the API documentation",
+            "href": str(app.url_path_for("swagger_ui_html")),
+            "type": "text/html",
+            "rel": "service-doc",
+        },
+    ),
+    (
+        False,
+        {
+            "title": "eoAPI Virtual Mosaic list (JSON)",
+            "href": str(app.url_path_for("list_searches")),
+            "type": "application/json",
+            "rel": "data",
+        },
+    ),
+    (
+        False,
+        {
+            "title": "eoAPI Virtual Mosaic builder",
+            "href": str(app.url_path_for("virtual_mosaic_builder")),
+            "type": "text/html",
+            "rel": "data",
+        },
+    ),
+    (
+        False,
+        {
+            "title": "eoAPI Virtual Mosaic viewer (template URL)",
+            "href": str(app.url_path_for("map_viewer", search_id="{search_id}")),
+            "type": "text/html",
+            "rel": "data",
+            "templated": True,
+        },
+    ),
+    (
+        False,
+        {
+            "title": "eoAPI Collection viewer (template URL)",
+            "href": str(
+                app.url_path_for("map_viewer", collection_id="{collection_id}")
+            ),
+            "type": "text/html",
+            "rel": "data",
+            "templated": True,
+        },
+    ),
+    (
+        False,
+        {
+            "title": "eoAPI Item viewer (template URL)",
+            "href": str(
+                app.url_path_for(
+                    "map_viewer",
+                    collection_id="{collection_id}",
+                    item_id="{item_id}",
+                )
+            ),
+            "type": "text/html",
+            "rel": "data",
+            "templated": True,
+        },
+    ),
+)
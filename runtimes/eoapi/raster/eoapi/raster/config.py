@@ -1,5 +1,7 @@
 """API settings."""
 
+from typing import Optional
+
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
@@ -14,6 +16,14 @@ class ApiSettings(BaseSettings):
     debug: bool = False
     root_path: str = ""
 
+    # Time, in seconds, the `/collections` (mosaic builder) response is cached
+    collections_cache_ttl: int = 30
+
+    # psycopg automatic prepared statements (queries executed more than N times
+    # are prepared server side). Set to an empty value to disable, e.g when
+    # connecting through PgBouncer in transaction mode.
+    db_prepare_threshold: Optional[int] = 3
+
     model_config = {
         "env_prefix": "EOAPI_RASTER_",
         "env_file": ".env",
@@ -29,3 +39,8 @@ class ApiSettings(BaseSettings):
     def parse_cors_methods(cls, v):
         """Parse CORS methods."""
         return [method.strip() for method in v.split(",")]
+
+    @field_validator("db_prepare_threshold", mode="before")
+    def parse_prepare_threshold(cls, v):
+        """Parse prepared statements threshold."""
+        return None if v == "" else v
@@ -0,0 +1,46 @@
+"""eoapi.raster middlewares."""
+
+from typing import Optional, Sequence
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+from titiler.core import middleware
+
+
+class CacheControlMiddleware(middleware.CacheControlMiddleware):
+    """MiddleWare to add CacheControl in response headers.
+
+    Same as titiler's middleware but paths are excluded using a simple prefix check
+    instead of regular expressions matched on every response.
+
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cachecontrol: Optional[str] = None,
+        cachecontrol_max_http_code: Optional[int] = 500,
+        exclude_prefix: Optional[Sequence[str]] = None,
+    ) -> None:
+        """Init Middleware.
+
+        Args:
+            app (ASGIApp): starlette/FastAPI application.
+            cachecontrol (str): Cache-Control string to add to the response.
+            cachecontrol_max_http_code (int): Only add Cache-Control for responses with lower status code.
+            exclude_prefix (sequence): Path prefixes for which no Cache-Control is added.
+
+        """
+        super().__init__(
+            app,
+            cachecontrol=cachecontrol,
+            cachecontrol_max_http_code=cachecontrol_max_http_code,
+        )
+        self.exclude_prefix = tuple(exclude_prefix or ())
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """Handle call."""
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        await super().__call__(scope, receive, send)